@@ -1,15 +1,60 @@
 from fastapi import FastAPI, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from dataclasses import dataclass
-from typing import List, Dict, Optional
-import pandas as pd
-import io
-from team_balancer import TeamBalancer, Player
+from typing import List, Dict, Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+from team_balancer import TeamBalancer, Player, POSITIONS, POSITION_CODES
+
+# Balancer log records are put on a queue and written out by a listener
+# thread, keeping stream I/O off the request path
+LOG_QUEUE = multiprocessing.Queue()
+
+def _init_logging(log_queue):
+    """Route team_balancer logging through the queue (also run in each pool worker)."""
+    logger = logging.getLogger("team_balancer")
+    logger.handlers = [QueueHandler(log_queue)]
+    # The listener writes the records; don't also pass them to the root logger
+    logger.propagate = False
+
+_init_logging(LOG_QUEUE)
+
+# Solver processes per API process. Each uvicorn worker (WEB_CONCURRENCY) gets
+# its own pool, so by default the CPUs are split between them.
+SOLVER_WORKERS = int(os.environ.get("SOLVER_WORKERS") or
+                     max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", 1))))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run the log listener and a pool of worker processes for the CPU-bound
+    solver (app.state.pool) for the app's lifetime.
+    """
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    log_listener = QueueListener(LOG_QUEUE, handler)
+    log_listener.start()
+    app.state.pool = ProcessPoolExecutor(max_workers=SOLVER_WORKERS, initializer=_init_logging,
+                                         initargs=(LOG_QUEUE,))
+    try:
+        yield
+    finally:
+        app.state.pool.shutdown(wait=False, cancel_futures=True)
+        log_listener.stop()
 
 app = FastAPI(
     title="Team Balancer API",
     description="API for balancing football teams based on player ratings and positions",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -21,26 +66,52 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@dataclass
+# Recently built balancers keyed by a hash of the roster, so repeated requests
+# for the same players skip parsing. TeamBalancer doesn't mutate its players
+# while balancing, so a cached instance can be shared between requests.
+BALANCER_CACHE_SIZE = 32
+_balancer_cache: "OrderedDict[bytes, TeamBalancer]" = OrderedDict()
+
+def _new_hash(data: bytes = b""):
+    """Hash used for balancer cache keys."""
+    return hashlib.blake2b(data, digest_size=16)
+
+def _get_balancer(key: bytes, build: Callable[[], TeamBalancer]) -> TeamBalancer:
+    """Return the cached balancer for key, calling build() on a miss (LRU eviction)."""
+    balancer = _balancer_cache.get(key)
+    if balancer is not None:
+        _balancer_cache.move_to_end(key)
+        return balancer
+    
+    balancer = _balancer_cache[key] = build()
+    if len(_balancer_cache) > BALANCER_CACHE_SIZE:
+        _balancer_cache.popitem(last=False)
+    return balancer
+
+def _solve(balancer: TeamBalancer, num_teams: int, time_limit: int, num_attempts: int) -> List[List[Player]]:
+    """Run the solver; executed inside a pool worker process."""
+    return balancer.balance_teams(num_teams, time_limit=time_limit, num_attempts=num_attempts)
+
+@dataclass(slots=True)
 class PlayerInput:
     name: str
     overall: float
     position: str
 
-@dataclass
+@dataclass(slots=True)
 class TeamRequest:
     players: List[PlayerInput]
     num_teams: int = 2
     time_limit: int = 30
     num_attempts: int = 5
 
-@dataclass
+@dataclass(slots=True)
 class PlayerOutput:
     name: str
     overall: float
     position: str
 
-@dataclass
+@dataclass(slots=True)
 class TeamOutput:
     team_number: int
     players: List[PlayerOutput]
@@ -48,75 +119,67 @@ class TeamOutput:
     position_distribution: Dict[str, int]
     total_rating: float
 
-@dataclass
+@dataclass(slots=True)
 class BalanceResponse:
     teams: List[TeamOutput]
     overall_mean: float
     max_rating_difference: float
 
+def _build_balance_response(teams: List[List[Player]]) -> BalanceResponse:
+    """Compute team statistics in a single pass over the players and build the response."""
+    team_outputs = []
+    rating_sum = 0.0
+    num_players = 0
+    
+    for team_num, players in enumerate(teams):
+        team_rating = 0.0
+        pos_counts = [0] * len(POSITIONS)
+        player_outputs = []
+        for p in players:
+            team_rating += p.overall
+            pos_counts[POSITION_CODES[p.position]] += 1
+            player_outputs.append(PlayerOutput(name=p.name, overall=p.overall, position=p.position))
+        
+        rating_sum += team_rating
+        num_players += len(players)
+        team_outputs.append(TeamOutput(
+            team_number=team_num + 1,
+            players=player_outputs,
+            average_rating=team_rating / len(players),
+            position_distribution=dict(zip(POSITIONS, pos_counts)),
+            total_rating=team_rating
+        ))
+    
+    team_means = [t.average_rating for t in team_outputs]
+    return BalanceResponse(
+        teams=team_outputs,
+        overall_mean=rating_sum / num_players,
+        max_rating_difference=max(team_means) - min(team_means)
+    )
+
 @app.post("/balance/json")
 async def balance_teams_json(request: TeamRequest):
     """
     Balance teams using JSON input
     """
     try:
-        # Create DataFrame from input
-        df = pd.DataFrame([{
-            'name': p.name,
-            'overall': p.overall,
-            'position': p.position
-        } for p in request.players])
-        
-        # Save DataFrame to temporary CSV
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_buffer.seek(0)
-        
-        # Initialize balancer with the CSV data
-        balancer = TeamBalancer(csv_buffer)
-        
-        # Balance teams
-        teams = balancer.balance_teams(
-            request.num_teams,
-            time_limit=request.time_limit,
-            num_attempts=request.num_attempts
+        # Get the balancer for this roster, building it directly from the request players
+        roster = json.dumps([[p.name, p.overall, p.position] for p in request.players])
+        key = _new_hash(roster.encode()).digest()
+        balancer = _get_balancer(key, lambda: TeamBalancer.from_players([
+            Player(name=p.name, overall=float(p.overall), position=p.position.strip())
+            for p in request.players
+        ]))
+        
+        # Balance teams in a worker process
+        teams = await asyncio.get_running_loop().run_in_executor(
+            app.state.pool, _solve, balancer, request.num_teams, request.time_limit, request.num_attempts
         )
         
         if not teams:
             raise HTTPException(status_code=400, detail="Could not balance teams with given constraints")
         
-        # Calculate overall statistics
-        all_players = []
-        team_outputs = []
-        
-        for team_num, players in sorted(teams.items()):
-            all_players.extend(players)
-            team_rating = sum(p.overall for p in players)
-            avg_rating = team_rating / len(players)
-            
-            # Count positions
-            pos_dist = {'DEF': 0, 'MID': 0, 'ATT': 0}
-            for p in players:
-                pos_dist[p.position] += 1
-            
-            team_outputs.append(TeamOutput(
-                team_number=team_num + 1,
-                players=[PlayerOutput(name=p.name, overall=p.overall, position=p.position) 
-                        for p in players],
-                average_rating=avg_rating,
-                position_distribution=pos_dist,
-                total_rating=team_rating
-            ))
-        
-        overall_mean = sum(p.overall for p in all_players) / len(all_players)
-        team_means = [t.average_rating for t in team_outputs]
-        max_diff = max(team_means) - min(team_means)
-        
-        return BalanceResponse(
-            teams=team_outputs,
-            overall_mean=overall_mean,
-            max_rating_difference=max_diff
-        )
+        return _build_balance_response(teams)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -132,51 +195,20 @@ async def balance_teams_csv(
     Balance teams using CSV file input
     """
     try:
-        # Read CSV content
-        content = await file.read()
-        csv_buffer = io.StringIO(content.decode())
-        
-        # Initialize balancer
-        balancer = TeamBalancer(csv_buffer)
-        
-        # Balance teams
-        teams = balancer.balance_teams(num_teams, time_limit=time_limit, num_attempts=num_attempts)
+        # Get the balancer for this file, letting pandas read the upload directly on a miss
+        key = hashlib.file_digest(file.file, _new_hash).digest()
+        file.file.seek(0)
+        balancer = _get_balancer(key, lambda: TeamBalancer(file.file))
+        
+        # Balance teams in a worker process
+        teams = await asyncio.get_running_loop().run_in_executor(
+            app.state.pool, _solve, balancer, num_teams, time_limit, num_attempts
+        )
         
         if not teams:
             raise HTTPException(status_code=400, detail="Could not balance teams with given constraints")
         
-        # Calculate overall statistics
-        all_players = []
-        team_outputs = []
-        
-        for team_num, players in sorted(teams.items()):
-            all_players.extend(players)
-            team_rating = sum(p.overall for p in players)
-            avg_rating = team_rating / len(players)
-            
-            # Count positions
-            pos_dist = {'DEF': 0, 'MID': 0, 'ATT': 0}
-            for p in players:
-                pos_dist[p.position] += 1
-            
-            team_outputs.append(TeamOutput(
-                team_number=team_num + 1,
-                players=[PlayerOutput(name=p.name, overall=p.overall, position=p.position) 
-                        for p in players],
-                average_rating=avg_rating,
-                position_distribution=pos_dist,
-                total_rating=team_rating
-            ))
-        
-        overall_mean = sum(p.overall for p in all_players) / len(all_players)
-        team_means = [t.average_rating for t in team_outputs]
-        max_diff = max(team_means) - min(team_means)
-        
-        return BalanceResponse(
-            teams=team_outputs,
-            overall_mean=overall_mean,
-            max_rating_difference=max_diff
-        )
+        return _build_balance_response(teams)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
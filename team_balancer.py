@@ -1,13 +1,154 @@
 import pandas as pd
+import numpy as np
 from pulp import *
-from typing import List, Dict, Tuple
+from typing import List, Tuple, Optional
 from dataclasses import dataclass
 from collections import defaultdict
+import logging
 import sys
 import random
 import time
 
-@dataclass
+logger = logging.getLogger(__name__)
+
+class _WarmStartHiGHS(HiGHS):
+    """In-process HiGHS that passes the variables' initial values as a MIP start."""
+
+    def callSolver(self, lp):
+        start = [(var.index, var.varValue) for var in lp.variables() if var.varValue is not None]
+        if start:
+            indices, values = zip(*start)
+            lp.solverModel.setSolution(len(indices), np.array(indices, dtype=np.int32),
+                                       np.array(values, dtype=np.float64))
+        super().callSolver(lp)
+
+def _make_solver(time_limit: float, warm_start: bool = False) -> LpSolver:
+    """
+    Pick the fastest available solver: HiGHS in-process (highspy), then the
+    HiGHS binary, then PuLP's bundled CBC.
+    """
+    if HiGHS().available():
+        return _WarmStartHiGHS(timeLimit=time_limit, msg=False)
+    if HiGHS_CMD().available():
+        return HiGHS_CMD(timeLimit=time_limit, msg=False, warmStart=warm_start)
+    return PULP_CBC_CMD(timeLimit=time_limit, msg=False, warmStart=warm_start)
+
+POSITIONS = ['DEF', 'MID', 'ATT']
+POSITION_CODES = {pos: code for code, pos in enumerate(POSITIONS)}
+
+# Shortest time limit given to a single ILP attempt, in seconds. HiGHS returns
+# no solution at all with a zero time limit.
+MIN_ATTEMPT_TIME_LIMIT = 1.0
+
+# Number of random player swaps applied to the best teams so far to build
+# the starting solution for the next ILP attempt
+PERTURBATION_SWAPS = 3
+
+# Largest difference between team average ratings accepted from the greedy
+# heuristic before falling back to the ILP
+GREEDY_MAX_DIFF = 0.05
+
+# Teams of up to this many players are always balanced with the greedy heuristic
+GREEDY_ONLY_TEAM_SIZE = 12
+
+# Stop the ILP attempts once the difference between team average ratings is below this
+TARGET_DIFF = 0.01
+
+def _greedy_balance(overalls: np.ndarray, pos_codes: np.ndarray, num_teams: int,
+                    pos_mins: np.ndarray, max_swaps: int = 1000) -> Optional[np.ndarray]:
+    """
+    Assign players to equally sized teams with a longest-processing-time greedy
+    pass followed by pairwise swap refinement.
+    Args:
+        overalls: Player ratings
+        pos_codes: Position code of each player (index into pos_mins, -1 for none)
+        num_teams: Number of teams to create
+        pos_mins: Minimum number of players per team for each position code
+        max_swaps: Maximum number of improving swaps to apply
+    Returns:
+        Team index for each player, or None if the position minimums can't be met.
+    """
+    n = len(overalls)
+    team_size = n // num_teams
+    num_positions = len(pos_mins)
+    if pos_mins.sum() > team_size:
+        return None
+    if any(np.count_nonzero(pos_codes == pos) < pos_mins[pos] * num_teams
+           for pos in range(num_positions)):
+        return None
+
+    order = np.argsort(-overalls, kind='stable')
+    assignment = np.full(n, -1, dtype=np.int64)
+    sums = np.zeros(num_teams)
+    sizes = np.zeros(num_teams, dtype=np.int64)
+    counts = np.zeros((num_teams, num_positions), dtype=np.int64)
+
+    def assign(i, candidates):
+        team = min(candidates, key=lambda t: sums[t])
+        assignment[i] = team
+        sums[team] += overalls[i]
+        sizes[team] += 1
+        if pos_codes[i] >= 0:
+            counts[team, pos_codes[i]] += 1
+
+    # 1. Fill position minimums: strongest players first, each to the weakest
+    #    team that still needs that position
+    quota_left = pos_mins * num_teams
+    for i in order:
+        pos = pos_codes[i]
+        if pos >= 0 and quota_left[pos] > 0:
+            quota_left[pos] -= 1
+            assign(i, [t for t in range(num_teams) if counts[t, pos] < pos_mins[pos]])
+
+    # 2. Distribute the remaining players to the weakest team with space left
+    for i in order:
+        if assignment[i] < 0:
+            assign(i, [t for t in range(num_teams) if sizes[t] < team_size])
+
+    # 3. Apply the best swap between two teams until none improves the balance,
+    #    scoring by rating spread first and sum of squares second
+    def score(team_sums):
+        return (team_sums.max() - team_sums.min(), (team_sums ** 2).sum())
+
+    best = score(sums)
+    for _ in range(max_swaps):
+        best_swap = None
+        for i in range(n):
+            for k in range(i + 1, n):
+                a, b = assignment[i], assignment[k]
+                if a == b or overalls[i] == overalls[k]:
+                    continue
+                pi, pk = pos_codes[i], pos_codes[k]
+                if pi != pk and ((pi >= 0 and counts[a, pi] <= pos_mins[pi]) or
+                                 (pk >= 0 and counts[b, pk] <= pos_mins[pk])):
+                    continue
+                delta = overalls[k] - overalls[i]
+                sums[a] += delta
+                sums[b] -= delta
+                candidate = score(sums)
+                sums[a] -= delta
+                sums[b] += delta
+                if candidate[0] < best[0] - 1e-9 or (candidate[0] <= best[0] + 1e-9 and
+                                                     candidate[1] < best[1] - 1e-9):
+                    best, best_swap = candidate, (i, k)
+        if best_swap is None:
+            break
+        i, k = best_swap
+        a, b = assignment[i], assignment[k]
+        delta = overalls[k] - overalls[i]
+        sums[a] += delta
+        sums[b] -= delta
+        if pos_codes[i] >= 0:
+            counts[a, pos_codes[i]] -= 1
+            counts[b, pos_codes[i]] += 1
+        if pos_codes[k] >= 0:
+            counts[b, pos_codes[k]] -= 1
+            counts[a, pos_codes[k]] += 1
+        assignment[i], assignment[k] = b, a
+
+    return assignment
+
+@dataclass(slots=True)
 class Player:
     name: str
     overall: float  # Rating from 0 to 5
@@ -15,7 +156,20 @@ class Player:
 
 class TeamBalancer:
     def __init__(self, csv_path_or_buffer):
-        self.players = self._load_players(csv_path_or_buffer)
+        self._init_players(self._load_players(csv_path_or_buffer))
+
+    @classmethod
+    def from_players(cls, players: List[Player]) -> 'TeamBalancer':
+        """Create a balancer from an existing list of players, skipping CSV parsing."""
+        balancer = cls.__new__(cls)
+        balancer._init_players(list(players))
+        return balancer
+
+    def _init_players(self, players: List[Player]):
+        # Players are never reordered after loading, so a balancer can be reused
+        # across calls; randomness comes from index permutations and perturbed
+        # starting solutions instead
+        self.players = players
         # Count players by position
         pos_counts = defaultdict(int)
         for player in self.players:
@@ -28,47 +182,114 @@ class TeamBalancer:
             'ATT': 2
         }
             
-        print(f"Players per position: {dict(pos_counts)}")
-        print(f"Total players: {len(self.players)}")
-        print(f"Minimum position requirements per team: {self.position_requirements}")
+        logger.debug("Players per position: %s", dict(pos_counts))
+        logger.debug("Total players: %d", len(self.players))
+        logger.debug("Minimum position requirements per team: %s", self.position_requirements)
+        self._index_players()
+
+    def _index_players(self):
+        """
+        Build parallel arrays of player ratings (overalls) and position codes
+        (pos_codes, index into POSITIONS or -1), plus the player indices and
+        minimum team count for each position code. Internal loops use these
+        instead of Player objects and position strings.
+        """
+        n = len(self.players)
+        self.overalls = np.fromiter((p.overall for p in self.players), dtype=np.float64, count=n)
+        self.pos_codes = np.fromiter((POSITION_CODES.get(p.position, -1) for p in self.players),
+                                     dtype=np.int8, count=n)
+        self._pos_idx = [np.flatnonzero(self.pos_codes == code) for code in range(len(POSITIONS))]
+        self._pos_mins = np.array([self.position_requirements.get(pos, 0) for pos in POSITIONS],
+                                  dtype=np.int64)
+
+    def _teams_from_assignment(self, assignment: np.ndarray, num_teams: int) -> List[List[Player]]:
+        """Group players by their assigned team index."""
+        teams = [[] for _ in range(num_teams)]
+        for i, j in enumerate(assignment):
+            teams[j].append(self.players[i])
+        return teams
+
+    def _assignment_diff(self, assignment: np.ndarray, num_teams: int) -> float:
+        """Max difference between team average ratings for an assignment."""
+        sizes = np.bincount(assignment, minlength=num_teams)
+        averages = np.bincount(assignment, weights=self.overalls, minlength=num_teams) / sizes
+        return float(averages.max() - averages.min())
 
     def _load_players(self, csv_path_or_buffer) -> List[Player]:
         """Load players from CSV file or buffer."""
-        df = pd.read_csv(csv_path_or_buffer)
-        players = []
+        df = pd.read_csv(csv_path_or_buffer, usecols=['name', 'overall', 'position'],
+                         dtype={'name': str, 'overall': np.float64, 'position': 'category'})
         
-        for _, row in df.iterrows():
-            player = Player(
-                name=row['name'],
-                overall=float(row['overall']),
-                position=str(row['position']).strip()  # Clean up position string
-            )
-            players.append(player)
+        # Extract whole columns at once instead of wrapping every row in a Series
+        names = df['name'].tolist()
+        overalls = df['overall'].astype(float).tolist()
+        positions = df['position'].astype(str).str.strip().tolist()  # Clean up position strings
         
-        # Shuffle the players list to add randomness
-        random.shuffle(players)
-        return players
+        return [Player(name=name, overall=overall, position=position)
+                for name, overall, position in zip(names, overalls, positions)]
+
+    def _random_order(self) -> np.ndarray:
+        """Random permutation of player indices, used instead of shuffling self.players."""
+        return np.array(random.sample(range(len(self.players)), len(self.players)), dtype=np.intp)
 
-    def _try_balance_teams(self, num_teams: int, time_limit: int = 30, rating_threshold: float = 0.1) -> Tuple[Dict[int, List[Player]], float]:
+    def _perturb_assignment(self, assignment: np.ndarray, num_teams: int, num_swaps: int) -> np.ndarray:
         """
-        Try to balance teams with some randomness while keeping them balanced.
-        Returns a tuple of (teams dict, max rating difference)
+        Return a copy of assignment (team index per player) with up to num_swaps
+        random swaps of players between two teams. Swaps that would break the
+        position requirements are skipped.
         """
+        assignment = assignment.copy()
+        if num_teams < 2:
+            return assignment
+        
+        known = self.pos_codes >= 0
+        counts = np.zeros((num_teams, len(POSITIONS)), dtype=np.int64)
+        np.add.at(counts, (assignment[known], self.pos_codes[known]), 1)
+        
+        for _ in range(num_swaps):
+            i = random.randrange(len(assignment))
+            others = np.flatnonzero(assignment != assignment[i])
+            k = others[random.randrange(len(others))]
+            a, b = assignment[i], assignment[k]
+            pi, pk = self.pos_codes[i], self.pos_codes[k]
+            if pi != pk:
+                if ((pi >= 0 and counts[a, pi] <= self._pos_mins[pi]) or
+                        (pk >= 0 and counts[b, pk] <= self._pos_mins[pk])):
+                    continue
+                if pi >= 0:
+                    counts[a, pi] -= 1
+                    counts[b, pi] += 1
+                if pk >= 0:
+                    counts[b, pk] -= 1
+                    counts[a, pk] += 1
+            assignment[i], assignment[k] = b, a
+        return assignment
+
+    def _try_balance_teams(self, num_teams: int, time_limit: float = 30,
+                           warm_start: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Try to balance teams.
+        If warm_start is given (a team index per player, e.g. a perturbation of the
+        best assignment so far) it is passed to the solver as the initial incumbent.
+        Returns a tuple of (team index per player, or None if no solution was
+        found, max rating difference)
+        """
+        n = len(self.players)
+        overalls = self.overalls
+        
         # Create the optimization problem
         prob = LpProblem("Team_Balancing", LpMinimize)
 
         # Create binary variables for each player-team combination
-        player_vars = LpVariable.dicts("player",
-                                     ((i, j) for i in range(len(self.players)) 
-                                      for j in range(num_teams)),
-                                     cat='Binary')
+        player_vars = {(i, j): LpVariable(f"p_{i}_{j}", cat='Binary')
+                       for i in range(n) for j in range(num_teams)}
 
         # Each player must be assigned to exactly one team
-        for i in range(len(self.players)):
-            prob += lpSum(player_vars[i,j] for j in range(num_teams)) == 1
+        for i in range(n):
+            prob += LpAffineExpression((player_vars[i,j], 1) for j in range(num_teams)) == 1
 
         # Calculate average team rating
-        total_rating = sum(p.overall for p in self.players)
+        total_rating = overalls.sum()
         target_team_rating = total_rating / num_teams
 
         # Create variables for team rating differences
@@ -76,97 +297,137 @@ class TeamBalancer:
         
         # Calculate team ratings and set up the objective to minimize maximum difference
         for j in range(num_teams):
-            team_rating = lpSum(self.players[i].overall * player_vars[i,j] 
-                              for i in range(len(self.players)))
+            team_rating = LpAffineExpression((player_vars[i,j], overalls[i])
+                                             for i in range(n))
             
-            # Allow some randomness within the threshold
-            prob += max_diff >= (team_rating - target_team_rating) - random.uniform(0, rating_threshold)
-            prob += max_diff >= (target_team_rating - team_rating) - random.uniform(0, rating_threshold)
+            prob += max_diff >= team_rating - target_team_rating
+            prob += max_diff >= target_team_rating - team_rating
 
         # Set the objective to minimize the maximum difference
         prob += max_diff
 
+        # Teams are interchangeable, so only allow player i in teams 0..i.
+        # This removes the relabelled copies of every solution from the search.
+        for i in range(min(n, num_teams)):
+            for j in range(i + 1, num_teams):
+                prob += player_vars[i,j] == 0
+
+        if warm_start is not None:
+            # Relabel the teams in order of first appearance so the starting
+            # solution satisfies the symmetry constraints above
+            _, first_seen, team_idx = np.unique(warm_start, return_index=True, return_inverse=True)
+            start = np.argsort(np.argsort(first_seen))[team_idx]
+            for i in range(n):
+                for j in range(num_teams):
+                    player_vars[i,j].setInitialValue(1 if j == start[i] else 0)
+
         # Position requirements for each team (minimum requirements)
         for j in range(num_teams):
-            for pos, min_count in self.position_requirements.items():
-                prob += lpSum(player_vars[i,j] 
-                            for i in range(len(self.players)) 
-                            if self.players[i].position == pos) >= min_count
+            for code, min_count in enumerate(self._pos_mins):
+                prob += LpAffineExpression((player_vars[i,j], 1)
+                                         for i in self._pos_idx[code]) >= min_count
 
             # Each team should have the same total number of players
-            prob += lpSum(player_vars[i,j] 
-                        for i in range(len(self.players))) == len(self.players) // num_teams
+            prob += LpAffineExpression((player_vars[i,j], 1)
+                                     for i in range(n)) == n // num_teams
 
         # Solve the problem with time limit
-        solver = PULP_CBC_CMD(timeLimit=time_limit, msg=False)  # Disable solver output
+        solver = _make_solver(time_limit, warm_start=warm_start is not None)
         status = prob.solve(solver)
 
         # Extract the results
-        teams = defaultdict(list)
+        assignment = None
         max_rating_diff = float('inf')
         
         if LpStatus[prob.status] == 'Optimal' or LpStatus[prob.status] == 'Not Solved':
-            for i in range(len(self.players)):
-                for j in range(num_teams):
-                    if value(player_vars[i,j]) == 1:
-                        teams[j].append(self.players[i])
+            # Variables are left unset (None) if the solver found no solution
+            sol = np.array([[player_vars[i,j].varValue or 0 for j in range(num_teams)]
+                            for i in range(n)])
             
-            if teams:
-                # Calculate actual maximum rating difference
-                team_ratings = [sum(p.overall for p in players) / len(players) 
-                              for players in teams.values()]
-                max_rating_diff = max(team_ratings) - min(team_ratings)
+            # Take each player's team as the largest value in its row rather than
+            # comparing floats to 1 (HiGHS may return e.g. 0.9999999)
+            if (sol.max(axis=1) > 0.5).all():
+                assignment = sol.argmax(axis=1)
+                max_rating_diff = self._assignment_diff(assignment, num_teams)
                 
-        return dict(teams), max_rating_diff
+        return assignment, max_rating_diff
+
+    def _greedy_assignment(self, num_teams: int) -> Optional[np.ndarray]:
+        """Team index per player from the greedy heuristic, or None if infeasible."""
+        # Visit players in random order so equally rated players are picked at random
+        order = self._random_order()
+        result = _greedy_balance(self.overalls[order], self.pos_codes[order], num_teams, self._pos_mins)
+        if result is None:
+            return None
+        
+        assignment = np.empty_like(result)
+        assignment[order] = result
+        return assignment
 
-    def balance_teams(self, num_teams: int, time_limit: int = 30, num_attempts: int = 5) -> Dict[int, List[Player]]:
+    def balance_teams(self, num_teams: int, time_limit: int = 30, num_attempts: int = 5) -> List[List[Player]]:
         """
         Try multiple times to get balanced teams with some randomness.
         Args:
             num_teams: Number of teams to create
-            time_limit: Maximum time in seconds for each attempt
+            time_limit: Total time in seconds shared by the attempts
             num_attempts: Number of attempts to try different random combinations
+                (reduced so each gets at least MIN_ATTEMPT_TIME_LIMIT)
         Returns:
-            Dictionary with team number as key and list of players as value.
+            List of teams indexed by team number, each a list of players.
+            Empty if no solution was found.
         """
         # Validate that teams can be divided equally
         total_players = len(self.players)
         if total_players % num_teams != 0:
-            print(f"\nError: Cannot divide {total_players} players into {num_teams} equal teams.")
-            print(f"The number of players must be divisible by the number of teams.")
-            print(f"Current players: {total_players}")
-            print(f"Players needed per team: {total_players / num_teams}")
-            return {}
+            logger.warning("Cannot divide %d players into %d equal teams "
+                           "(%.2f players per team). The number of players must be "
+                           "divisible by the number of teams.",
+                           total_players, num_teams, total_players / num_teams)
+            return []
 
         players_per_team = total_players // num_teams
-        print(f"\nCreating {num_teams} teams with {players_per_team} players each")
+        logger.debug("Creating %d teams with %d players each", num_teams, players_per_team)
         
-        # Try multiple times with different random seeds
-        best_teams = {}
-        best_diff = float('inf')
+        # The greedy heuristic is usually good enough, and is always used for small
+        # teams; only run the ILP if it isn't
+        best = self._greedy_assignment(num_teams)
+        best_diff = float('inf') if best is None else self._assignment_diff(best, num_teams)
+        if best is not None and (best_diff <= GREEDY_MAX_DIFF or players_per_team <= GREEDY_ONLY_TEAM_SIZE):
+            logger.debug("Found greedy solution with maximum rating difference: %.2f", best_diff)
+            return self._teams_from_assignment(best, num_teams)
         
+        # Try multiple times, each from a different starting solution. The greedy
+        # assignment (if any) is the result to beat, so the ILP can only improve on it.
+        # Split the time limit between the attempts, running fewer of them if
+        # needed so each gets at least MIN_ATTEMPT_TIME_LIMIT
+        num_attempts = max(1, min(num_attempts, int(time_limit // MIN_ATTEMPT_TIME_LIMIT)))
+        attempt_time_limit = max(time_limit / num_attempts, MIN_ATTEMPT_TIME_LIMIT)
         for attempt in range(num_attempts):
-            print(f"\nAttempt {attempt + 1}/{num_attempts}...")
-            # Shuffle players for each attempt
-            random.shuffle(self.players)
-            
-            # Try to balance teams
-            teams, max_diff = self._try_balance_teams(num_teams, time_limit // num_attempts)
+            logger.debug("Attempt %d/%d...", attempt + 1, num_attempts)
+            # Start each attempt from a random perturbation of the best assignment
+            # so far so the solver searches a different neighbourhood every time
+            start = None if best is None else self._perturb_assignment(best, num_teams, PERTURBATION_SWAPS)
+            assignment, max_diff = self._try_balance_teams(num_teams, attempt_time_limit,
+                                                           warm_start=start)
             
             # Keep the best result
-            if teams and max_diff < best_diff:
-                best_teams = teams
+            if assignment is not None and max_diff < best_diff:
+                best = assignment
                 best_diff = max_diff
+            
+            # Further attempts can't meaningfully improve on this
+            if best_diff < TARGET_DIFF:
+                break
         
-        if best_teams:
-            print(f"\nFound solution with maximum rating difference: {best_diff:.2f}")
-            print(f"Solution status: Optimal")
-        else:
-            print("Could not find a solution. Try adjusting the requirements or increasing the time limit.")
+        if best is None:
+            logger.warning("Could not find a solution. Try adjusting the requirements "
+                           "or increasing the time limit.")
+            return []
 
-        return best_teams
+        logger.debug("Found solution with maximum rating difference: %.2f", best_diff)
+        return self._teams_from_assignment(best, num_teams)
 
-    def print_teams(self, teams: Dict[int, List[Player]]):
+    def print_teams(self, teams: List[List[Player]]):
         """Print the balanced teams with their statistics."""
         if not teams:
             return
@@ -176,10 +437,7 @@ class TeamBalancer:
         team_means = []  # Store team means for final comparison
         all_players = []  # Store all players for overall mean
         
-        # Sort teams by team number
-        sorted_teams = sorted(teams.items(), key=lambda x: x[0])
-        
-        for team_num, players in sorted_teams:
+        for team_num, players in enumerate(teams):
             print(f"\nTeam {team_num + 1}:")
             print("-" * 50)
             team_overall = sum(p.overall for p in players) / len(players)
@@ -226,6 +484,9 @@ class TeamBalancer:
         print("-" * 50)
 
 def main():
+    # Show the balancer's progress messages on the command line
+    logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+    
     # Set random seed based on current time
     random.seed(time.time())
     
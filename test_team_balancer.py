@@ -0,0 +1,37 @@
+import numpy as np
+
+from team_balancer import _greedy_balance
+
+# Two of each position per team, as TeamBalancer requires
+POS_MINS = np.array([2, 2, 2], dtype=np.int64)
+
+def _roster(num_players, seed=0):
+    """Random ratings with an equal number of players in each position."""
+    rng = np.random.default_rng(seed)
+    overalls = rng.uniform(1, 5, num_players).round(1)
+    pos_codes = np.arange(num_players, dtype=np.int8) % len(POS_MINS)
+    return overalls, pos_codes
+
+def test_greedy_balance_equal_team_sizes():
+    for num_teams in (2, 3, 4):
+        overalls, pos_codes = _roster(num_teams * 9)
+        assignment = _greedy_balance(overalls, pos_codes, num_teams, POS_MINS)
+        assert assignment is not None
+        assert np.bincount(assignment, minlength=num_teams).tolist() == [9] * num_teams
+
+def test_greedy_balance_position_minimums():
+    for seed in range(5):
+        overalls, pos_codes = _roster(24, seed)
+        assignment = _greedy_balance(overalls, pos_codes, 3, POS_MINS)
+        counts = np.zeros((3, len(POS_MINS)), dtype=np.int64)
+        np.add.at(counts, (assignment, pos_codes), 1)
+        assert (counts >= POS_MINS).all()
+
+def test_greedy_balance_too_few_players_in_a_position():
+    overalls, pos_codes = _roster(18)
+    pos_codes[pos_codes == 2] = 1  # no ATT players
+    assert _greedy_balance(overalls, pos_codes, 2, POS_MINS) is None
+
+def test_greedy_balance_minimums_exceed_team_size():
+    overalls, pos_codes = _roster(10)
+    assert _greedy_balance(overalls, pos_codes, 2, POS_MINS) is None